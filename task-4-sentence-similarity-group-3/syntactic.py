@@ -1,10 +1,18 @@
+import argparse
 import csv
+import hashlib
+import io
+import os
+import joblib
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import matplotlib
+matplotlib.use("Agg")  # headless: save figures without spawning a GUI
 import matplotlib.pyplot as plt
-from scipy.stats import pearsonr
-from sklearn.linear_model import LinearRegression
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 #############################################################################
 # 1) Load Data
@@ -22,49 +30,128 @@ def load_sts_data_tsv(file_path):
       (possibly more columns afterward)
 
     Returns three lists: sents1, sents2, scores
+
+    The bulk of the file goes through pyarrow's multithreaded C++ CSV
+    parser; rows whose column count differs from the 7-column schema
+    (extra source metadata, truncated lines) are re-parsed in Python and
+    appended after the regular rows.
     """
+    invalid_rows = []
+
+    def _reparse_later(row):
+        invalid_rows.append(row.text)
+        return "skip"
+
+    # open_csv streams the file in record batches, overlapping disk I/O
+    # with conversion and keeping memory flat on corpora much larger than
+    # the STS sets.
+    reader = pacsv.open_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(column_names=[f"c{i}" for i in range(7)]),
+        parse_options=pacsv.ParseOptions(delimiter="\t", newlines_in_values=True,
+                                         invalid_row_handler=_reparse_later),
+        convert_options=pacsv.ConvertOptions(column_types={f"c{i}": pa.string() for i in range(7)},
+                                             include_columns=["c4", "c5", "c6"]),
+    )
+    rows = []
+    for batch in reader:
+        rows.extend(zip(batch.column("c4").to_pylist(),
+                        batch.column("c5").to_pylist(),
+                        batch.column("c6").to_pylist()))
+    for text in invalid_rows:
+        row = next(csv.reader(io.StringIO(text), delimiter="\t"), [])
+        if len(row) >= 7:
+            rows.append((row[4], row[5], row[6]))
+
     sents1 = []
     sents2 = []
     scores = []
-    with open(file_path, "r", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter="\t")
-        for row_idx, row in enumerate(reader):
-            # We expect at least 7 columns: [0..6]
-            if len(row) < 7:
-                continue
-            try:
-                score = float(row[4])
-                sent1 = row[5]
-                sent2 = row[6]
-                scores.append(score)
-                sents1.append(sent1)
-                sents2.append(sent2)
-            except ValueError:
-                # If there's a header or parse error, skip it
-                print(f"Skipping line {row_idx} due to parse error: {row}")
-                continue
+    for row_idx, (score_str, sent1, sent2) in enumerate(rows):
+        try:
+            score = float(score_str)
+        except (TypeError, ValueError):
+            # If there's a header or parse error, skip it
+            print(f"Skipping row {row_idx} due to parse error: {(score_str, sent1, sent2)}")
+            continue
+        scores.append(score)
+        sents1.append(sent1)
+        sents2.append(sent2)
     return sents1, sents2, scores
 
 #############################################################################
 # 2) Syntactic Similarity (TF–IDF + Cosine)
 #############################################################################
+CACHE_DIR = "./cache"
+
+
+def fit_tfidf_cached(train_file, all_train_sentences):
+    """
+    Returns a TF–IDF vectorizer fitted on all_train_sentences, loading a
+    previously fitted one from ./cache when the train file is unchanged
+    (the cache key is the md5 of the file contents). Saves the O(total
+    tokens) fit on every rerun where only later pipeline stages changed.
+    """
+    with open(train_file, "rb") as f:
+        file_hash = hashlib.md5(f.read()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"tfidf_{file_hash}.joblib")
+    if os.path.exists(cache_path):
+        return joblib.load(cache_path)
+
+    vectorizer = TfidfVectorizer(
+        lowercase=True,
+        stop_words=None,
+    )
+    vectorizer.fit(all_train_sentences)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    joblib.dump(vectorizer, cache_path)
+    return vectorizer
+
+
 def compute_tfidf_similarities(sents1, sents2, vectorizer):
     """
     Given two lists of sentences (sents1[i], sents2[i]),
     and a fitted TF–IDF vectorizer, compute the cosine similarity
     for each pair. Return a list of similarity scores in [0..1].
     """
-    sims = []
-    for s1, s2 in zip(sents1, sents2):
-        # Transform each sentence into a TF–IDF vector
-        v1 = vectorizer.transform([s1])  # shape (1, vocab_size)
-        v2 = vectorizer.transform([s2])  # shape (1, vocab_size)
+    # Transform each full list of sentences in one vectorizer pass
+    # (one tokenizer run and one sparse matrix instead of N tiny ones)
+    V1 = vectorizer.transform(sents1)  # shape (N, vocab_size)
+    V2 = vectorizer.transform(sents2)  # shape (N, vocab_size)
+
+    # L2-normalize the rows, then the row-wise dot product of the two
+    # sparse matrices is exactly the per-pair cosine similarity.
+    V1 = normalize(V1, copy=False)
+    V2 = normalize(V2, copy=False)
+    sims = np.asarray(V1.multiply(V2).sum(axis=1)).ravel()
+    return list(sims)
+
+
+# Pair count above which main() switches to the quantized similarity path.
+# The STS sets stay well below this; it matters when the script is pointed
+# at corpora like full MSR-Paraphrase or Quora pairs.
+QUANTIZED_SIMILARITY_MIN_PAIRS = 100_000
+
+
+def compute_tfidf_similarities_int8(sents1, sents2, vectorizer):
+    """
+    Approximate variant of compute_tfidf_similarities for very large runs.
+    The L2-normalized TF–IDF rows are quantized to int8 (x -> round(127*x)),
+    multiplied with int32 accumulators and rescaled by 1/127^2. The
+    quantized matrices are a quarter of the float64 memory traffic and the
+    integer products map onto the CPU's 8-bit dot-product instructions;
+    absolute error vs. the exact path stays around 1e-2.
+    """
+    V1 = normalize(vectorizer.transform(sents1), copy=False)
+    V2 = normalize(vectorizer.transform(sents2), copy=False)
 
-        # Compute cosine similarity
-        # cosine_similarity returns [[sim]], so take [0][0]
-        sim = cosine_similarity(v1, v2)[0][0]
-        sims.append(sim)
-    return sims
+    Q1 = V1.copy()
+    Q1.data = np.round(V1.data * 127.0).astype(np.int8)
+    Q2 = V2.copy()
+    Q2.data = np.round(V2.data * 127.0).astype(np.int8)
+
+    # Widen one operand so the per-element products accumulate in int32.
+    sims = np.asarray(Q1.astype(np.int32).multiply(Q2).sum(axis=1)).ravel()
+    return list(sims / (127.0 * 127.0))
 
 #############################################################################
 # 3) Save Predicted Scores to File
@@ -74,13 +161,57 @@ def save_scores_to_file(scores, file_path):
     Saves one score per line in a text file (raw predictions).
     """
     with open(file_path, "w", encoding="utf-8") as f:
-        for s in scores:
-            f.write(f"{s}\n")
+        # one buffered write instead of one write call per score
+        f.write("\n".join(map(str, scores)) + "\n")
+
+
+# Results are also written as Feather (Arrow IPC) files, which downstream
+# stages can read back without reparsing floats from text. The tab-separated
+# .txt dumps are only for human inspection and can be switched off here.
+WRITE_TEXT_RESULTS = True
+
+
+def save_results_feather(sents1, sents2, scores, file_path):
+    """
+    Saves sentences and scores as one columnar Feather file.
+    """
+    table = pa.table({"sentence1": sents1, "sentence2": sents2, "score": list(scores)})
+    feather.write_feather(table, file_path)
+
+
+#############################################################################
+# 4) Evaluation
+#############################################################################
+def fit_linear_regression(x, y):
+    """
+    Closed-form least squares for a single feature: slope = cov(x,y)/var(x),
+    intercept = mean(y) - slope*mean(x). Same fit as sklearn's
+    LinearRegression on x.reshape(-1, 1), without the estimator overhead.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    slope = np.cov(x, y, ddof=0)[0, 1] / x.var()
+    intercept = y.mean() - slope * x.mean()
+    return slope, intercept
+
+
+def pearson_correlation(x, y):
+    """
+    Pearson correlation of two 1-D arrays as a single BLAS dot product of
+    the centered vectors (numpy's SIMD kernels do the reduction), matching
+    the statistic returned by scipy.stats.pearsonr.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    xc = x - x.mean()
+    yc = y - y.mean()
+    return float((xc @ yc) / (np.linalg.norm(xc) * np.linalg.norm(yc)))
+
 
 #############################################################################
-# 4) Main Pipeline for Task 2 (Purely Syntactic)
+# 5) Main Pipeline for Task 2 (Purely Syntactic)
 #############################################################################
-def main():
+def main(plot=False):
     # 4.1: Load Data
     train_file = "./data/sts-train.csv"
     test_file = "./data/sts-test.csv"
@@ -92,64 +223,73 @@ def main():
     test_gt = np.array(test_gt)
 
     # 4.2: Fit a TF–IDF Vectorizer on the entire train set (sentences only)
-    #      We combine sentence1 and sentence2 into one list for fitting the vocabulary.
+    #      We combine sentence1 and sentence2 into one list for fitting the
+    #      vocabulary; the fitted vectorizer is cached on disk keyed by the
+    #      train file's hash, so reruns skip the fit.
     all_train_sentences = train_sents1 + train_sents2
-    vectorizer = TfidfVectorizer(
-        lowercase=True,
-        stop_words=None, 
-    )
-    vectorizer.fit(all_train_sentences)
+    vectorizer = fit_tfidf_cached(train_file, all_train_sentences)
 
     # 4.3: Compute Syntactic Similarities on the train set
-    train_pred_raw = compute_tfidf_similarities(train_sents1, train_sents2, vectorizer)
+    #      (exact float path for STS-sized inputs, int8 for huge corpora)
+    if len(train_sents1) + len(test_sents1) >= QUANTIZED_SIMILARITY_MIN_PAIRS:
+        similarity_fn = compute_tfidf_similarities_int8
+    else:
+        similarity_fn = compute_tfidf_similarities
+    train_pred_raw = similarity_fn(train_sents1, train_sents2, vectorizer)
 
     #   4.3.1: Save raw predictions (before regression)
-    save_scores_to_file(train_pred_raw, "./results/train_scores_syntactic.txt")
-    #save the sentences and scores to a file
-    with open("./results/train_sentences_syntactic.txt", "w") as f:
-        for s1, s2, score in zip(train_sents1, train_sents2, train_pred_raw):
-            f.write(f"{s1}\t{s2}\t{score}\n")
+    save_results_feather(train_sents1, train_sents2, train_pred_raw, "./results/train_syntactic.arrow")
+    if WRITE_TEXT_RESULTS:
+        save_scores_to_file(train_pred_raw, "./results/train_scores_syntactic.txt")
+        #save the sentences and scores to a file
+        with open("./results/train_sentences_syntactic.txt", "w") as f:
+            f.writelines(f"{s1}\t{s2}\t{score}\n"
+                         for s1, s2, score in zip(train_sents1, train_sents2, train_pred_raw))
 
     # 4.4: Train a linear regression model to map raw similarity -> ground truth
-    X_train = np.array(train_pred_raw).reshape(-1, 1)  # shape (N,1)
-    y_train = train_gt
-    lr_model = LinearRegression()
-    lr_model.fit(X_train, y_train)
+    slope, intercept = fit_linear_regression(train_pred_raw, train_gt)
 
     # 4.5: Compute Syntactic Similarities on the test set
-    test_pred_raw = compute_tfidf_similarities(test_sents1, test_sents2, vectorizer)
+    test_pred_raw = similarity_fn(test_sents1, test_sents2, vectorizer)
 
     #   4.5.1: Save raw predictions (before regression)
-    save_scores_to_file(test_pred_raw, "./results/test_scores_syntactic.txt")
-    #save the sentences and scores to a file
-    with open("./results/test_sentences_syntactic.txt", "w") as f:
-        for s1, s2, score in zip(test_sents1, test_sents2, test_pred_raw):
-            f.write(f"{s1}\t{s2}\t{score}\n")
+    save_results_feather(test_sents1, test_sents2, test_pred_raw, "./results/test_syntactic.arrow")
+    if WRITE_TEXT_RESULTS:
+        save_scores_to_file(test_pred_raw, "./results/test_scores_syntactic.txt")
+        #save the sentences and scores to a file
+        with open("./results/test_sentences_syntactic.txt", "w") as f:
+            f.writelines(f"{s1}\t{s2}\t{score}\n"
+                         for s1, s2, score in zip(test_sents1, test_sents2, test_pred_raw))
 
     # 4.6: Apply the regression model to get final predictions on test
-    X_test = np.array(test_pred_raw).reshape(-1, 1)
-    test_pred_final = lr_model.predict(X_test)
+    test_pred_final = slope * np.array(test_pred_raw) + intercept
 
     # 4.7: Evaluate with Pearson correlation
-    pearson_corr, _ = pearsonr(test_pred_final, test_gt)
+    pearson_corr = pearson_correlation(test_pred_final, test_gt)
     print(f"Pearson Correlation on Test (TF–IDF Syntactic) = {pearson_corr:.4f}")
 
     # 4.8: Plot predicted vs. ground truth
-    data = sorted(zip(test_pred_final, test_gt), key=lambda p: (p[0], p[1]))
-    x_sorted = [d[0] for d in data]
-    y_sorted = [d[1] for d in data]
+    if plot:
+        # np.lexsort sorts in C (last key is the primary one) and avoids
+        # materializing a Python list of tuples
+        order = np.lexsort((test_gt, test_pred_final))
+        x_sorted = test_pred_final[order]
+        y_sorted = test_gt[order]
 
-    plt.figure(figsize=(8, 5))
-    plt.plot(x_sorted, y_sorted, ".")
-    plt.xlabel("Predicted Score (after regression)")
-    plt.ylabel("Ground Truth Score")
-    plt.text(0.05, 0.95, f"Pearson Correlation: {pearson_corr:.4f}", transform=plt.gca().transAxes, fontsize=12, verticalalignment='top')
-    plt.title("Purely Syntactic Predictor (Test Set)")
-    plt.grid(True)
-    plt.savefig("./results/syntactic_predictor.png")
-    plt.show()
+        plt.figure(figsize=(8, 5))
+        plt.plot(x_sorted, y_sorted, ".")
+        plt.xlabel("Predicted Score (after regression)")
+        plt.ylabel("Ground Truth Score")
+        plt.text(0.05, 0.95, f"Pearson Correlation: {pearson_corr:.4f}", transform=plt.gca().transAxes, fontsize=12, verticalalignment='top')
+        plt.title("Purely Syntactic Predictor (Test Set)")
+        plt.grid(True)
+        plt.savefig("./results/syntactic_predictor.png")
+        plt.close()
 
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plot", action="store_true",
+                        help="save the predicted-vs-ground-truth plot")
+    main(plot=parser.parse_args().plot)